@@ -1,11 +1,138 @@
-import networkx as nx
+import sys
+from itertools import islice
+
+import numpy as np
 
 __all__ = ['detect_request_bundle', 'detect_frontend_integration',
            'detect_information_holder_resource']
 
+# Bits given to each of from_service, to_service and endpoint in a call code
+_ID_BITS = 21
+_ID_MASK = (1 << _ID_BITS) - 1
+
+
+def _closed_runs(ends, start):
+    """Compute the length of consecutive runs from the positions closing them.
+
+    Parameters
+    __________
+    ends : numpy.ndarray[int],
+        Index of the call closing each run, in increasing order
+    start : int,
+        Index where the first run started (negative if it started in a
+        previous chunk)
+
+    Returns
+    _______
+    counts : numpy.ndarray[int],
+        Length of each run
+    start : int,
+        Index where the run left open after the last one started
+    """
+
+    if not len(ends):
+        return ends, start
+    starts = np.empty_like(ends)
+    starts[0] = start
+    starts[1:] = ends[:-1]
+    return ends - starts, int(ends[-1])
+
+
+def _scan_bundles(svc_ids, ep_ids, t_s, t_e, start_s, start_e):
+    """Find bundles in a chunk of integer-coded service and endpoint calls.
+
+    Parameters
+    __________
+    svc_ids : numpy.ndarray[int],
+        Integer codes of (from_service, to_service) of each call
+    ep_ids : numpy.ndarray[int],
+        Integer codes of (from_service, to_service, endpoint) of each call
+    t_s : int,
+        Minimum length of a service-level bundle
+    t_e : int,
+        Minimum length of an endpoint-level bundle
+    start_s : int,
+        Index where the service-level run containing svc_ids[0] started
+        (negative if it started in a previous chunk)
+    start_e : int,
+        Index where the endpoint-level run containing ep_ids[0] started
+
+    Returns
+    _______
+    ends_service : numpy.ndarray[int],
+        Index of the call closing each service-level bundle
+    counts_service : numpy.ndarray[int],
+        Length of each service-level bundle
+    start_s : int,
+        Index where the service-level run left open started
+    ends_endpoint : numpy.ndarray[int],
+        Index of the call closing each endpoint-level bundle
+    counts_endpoint : numpy.ndarray[int],
+        Length of each endpoint-level bundle
+    start_e : int,
+        Index where the endpoint-level run left open started
+    """
+
+    # Only runs closed by a different call are reported, the run reaching
+    # the end of the chunk is left open. A service-level run can only end
+    # where the endpoint-level run ends as well.
+    ends_endpoint = np.flatnonzero(ep_ids[1:] != ep_ids[:-1]) + 1
+    ends_service = ends_endpoint[svc_ids[ends_endpoint]
+                                 != svc_ids[ends_endpoint - 1]]
+
+    counts_service, start_s = _closed_runs(ends_service, start_s)
+    selected = counts_service >= t_s
+    ends_service = ends_service[selected]
+    counts_service = counts_service[selected]
+
+    counts_endpoint, start_e = _closed_runs(ends_endpoint, start_e)
+    selected = counts_endpoint >= t_e
+    ends_endpoint = ends_endpoint[selected]
+    counts_endpoint = counts_endpoint[selected]
+
+    return (ends_service, counts_service, start_s,
+            ends_endpoint, counts_endpoint, start_e)
+
+
+def _simple_degrees(G):
+    """Get degree arrays of a multigraph's nodes.
+
+    Parallel edges are collapsed, so degrees are those of the simple DiGraph
+    of G.
+
+    Parameters
+    __________
+    G : networkx.MultiDiGraph,
+        Graph to be studied
+
+    Returns
+    _______
+    nodes : list[str],
+        Nodes of G, position in this list is the index used in the arrays
+    in_deg : numpy.ndarray[int],
+        For each node, the number of distinct nodes calling it
+    out_deg : numpy.ndarray[int],
+        For each node, the number of distinct nodes it calls
+    single_pred : numpy.ndarray[int],
+        For each node called by exactly one node, the index of that node,
+        -1 for all other nodes
+    """
+
+    nodes = list(G)
+    index = {node: i for i, node in enumerate(nodes)}
+    pred = G.pred
+    succ = G.succ
+    in_deg = np.array([len(pred[node]) for node in nodes], dtype=np.int64)
+    out_deg = np.array([len(succ[node]) for node in nodes], dtype=np.int64)
+    single_pred = np.array([index[next(iter(pred[node]))]
+                            if len(pred[node]) == 1 else -1
+                            for node in nodes], dtype=np.int64)
+    return nodes, in_deg, out_deg, single_pred
+
 
 def detect_request_bundle(pipeline, threshold_service=2,
-                          threshold_endpoint=2, user='NoUser'):
+                          threshold_endpoint=2, user='NoUser',
+                          verbose=True, chunk_size=65536):
     """Detect request bundle anti-pattern, i.e. consecutive calls between same services.
 
     Bundles are detected on service level (service A repeatedly calls same service B)
@@ -14,9 +141,9 @@ def detect_request_bundle(pipeline, threshold_service=2,
     bundle is a tuple of the form (from_service, to_service, count) for service-level detection
     and (from_service, to_service, endpoint, count) for endpoint-level detection.
 
-    pipelines : list[tuple[datetime, str, str, str]],
-        A list containing a call pipeline for a user (one of the items in
-        pipelines returned by parse_logs())
+    pipeline : iterable[tuple[datetime, str, str, str]],
+        A call pipeline for a user (one of the items in pipelines returned by
+        parse_logs()), any iterable works, e.g. a generator reading a log
     threshold_service : int, optional (default 2)
         Minimum count of consecutive calls necessary to make up a bundle in
         service-level detection (default = 2, i.e. any repeated call
@@ -27,6 +154,12 @@ def detect_request_bundle(pipeline, threshold_service=2,
                                   makes a bundle)
     user : str, optional (default 'NoUser')
         User's name to put in logs
+    verbose : bool, optional (default True)
+        If False, detected bundles are not printed
+    chunk_size : int, optional (default 65536)
+        Number of calls coded and scanned at a time, bounds the memory used
+        on long pipelines. Bundles are printed once the chunk in which they
+        end has been scanned
 
     Returns
     _______
@@ -36,41 +169,90 @@ def detect_request_bundle(pipeline, threshold_service=2,
         Detected bundles in endpoint-level detection
     """
 
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+
+    # Code each call as one integer packing the ids of its from_service,
+    # to_service and endpoint, so equal calls get equal codes and dropping
+    # the endpoint bits gives the service-level code
+    ids = {}
+    last_from_service = last_to_service = last_endpoint = None
+    code = -1
+
+    # Calls are coded and scanned chunk by chunk. Each chunk is preceded by
+    # the last call of the previous one (-1 before the first chunk), so runs
+    # continue across chunks, and their starts are kept relative to the
+    # current chunk.
+    calls = iter(pipeline)
+    start_service = start_endpoint = 1
     bundles_service = []
     bundles_endpoint = []
-    last_call_service = None
-    last_call_endpoint = None
-    count_service = 1
-    count_endpoint = 1
-    for (time, from_service, to_service, endpoint) in pipeline:
-        current_call_service = from_service, to_service
-        current_call_endpoint = from_service, to_service, endpoint
-        if current_call_service == last_call_service:
-            count_service += 1
-        else:
-            if count_service >= threshold_service:
-                bundles_service.append((*last_call_service, count_service))
-                print(f"{user}: Service-level request bundle detected between "
-                      f"{last_call_service[0]} and {last_call_service[1]} "
-                      f"with count {count_service}")
-            count_service = 1
-            last_call_service = current_call_service
-                
-        if current_call_endpoint == last_call_endpoint:
-            count_endpoint += 1
-        else:
-            if count_endpoint >= threshold_endpoint:
-                bundles_endpoint.append((*last_call_endpoint, count_endpoint))
-                print(f"{user}: Endpoint-level request bundle detected between "
-                      f"{last_call_endpoint[0]} and {last_call_endpoint[1]}"
-                      f"{last_call_endpoint[2]} with count {count_endpoint}")
-            count_endpoint = 1
-            last_call_endpoint = current_call_endpoint
+    while True:
+        calls_endpoint = [code]
+        for (time, from_service, to_service, endpoint) in islice(calls,
+                                                                 chunk_size):
+            # A repeated call reuses the previous code without any lookups
+            if (endpoint != last_endpoint or to_service != last_to_service
+                    or from_service != last_from_service):
+                code = (ids.setdefault(from_service, len(ids)) << 2*_ID_BITS
+                        | ids.setdefault(to_service, len(ids)) << _ID_BITS
+                        | ids.setdefault(endpoint, len(ids)))
+                last_from_service = from_service
+                last_to_service = to_service
+                last_endpoint = endpoint
+            calls_endpoint.append(code)
+        if (chunk_length := len(calls_endpoint) - 1) == 0:
+            break
+        if len(ids) > _ID_MASK + 1:
+            raise ValueError(f"Too many distinct services and endpoints "
+                             f"({len(ids)}) to pack calls into integers")
+        calls_endpoint = np.array(calls_endpoint, dtype=np.int64)
+        calls_service = calls_endpoint >> _ID_BITS
+
+        (ends_service, counts_service, start_service,
+         ends_endpoint, counts_endpoint, start_endpoint) = \
+            _scan_bundles(calls_service, calls_endpoint, threshold_service,
+                          threshold_endpoint, start_service, start_endpoint)
+        start_service -= chunk_length
+        start_endpoint -= chunk_length
+
+        # A bundle's code is read at its last call, which is in this chunk
+        names = list(ids)
+        codes = calls_service[ends_service - 1].tolist()
+        counts = counts_service.tolist()
+        chunk_service = [(names[c >> _ID_BITS], names[c & _ID_MASK], n)
+                         for c, n in zip(codes, counts)]
+        codes = calls_endpoint[ends_endpoint - 1].tolist()
+        counts = counts_endpoint.tolist()
+        chunk_endpoint = [(names[c >> 2*_ID_BITS],
+                           names[c >> _ID_BITS & _ID_MASK],
+                           names[c & _ID_MASK], n)
+                          for c, n in zip(codes, counts)]
+        bundles_service += chunk_service
+        bundles_endpoint += chunk_endpoint
+
+        if verbose:
+            messages = [f"{user}: Service-level request bundle detected "
+                        f"between {from_service} and {to_service} with count "
+                        f"{count}\n"
+                        for from_service, to_service, count in chunk_service]
+            messages += [f"{user}: Endpoint-level request bundle detected "
+                         f"between {from_service} and {to_service}{endpoint} "
+                         f"with count {count}\n"
+                         for from_service, to_service, endpoint, count
+                         in chunk_endpoint]
+            # Both kinds are already ordered by the position closing them,
+            # a stable merge gives the order of a sequential scan (service
+            # before endpoint message when closed by the same call)
+            order = np.argsort(np.concatenate((ends_service, ends_endpoint)),
+                               kind='stable').tolist()
+            sys.stdout.write("".join([messages[i] for i in order]))
 
     return bundles_service, bundles_endpoint
 
 
-def detect_frontend_integration(G, frontend_services=None, user='NoUser'):
+def detect_frontend_integration(G, frontend_services=None, user='NoUser',
+                                verbose=True):
     """Detect the Frontend Integration API pattern.
 
     Frontend services should only have outgoing calls. Two things can be done -
@@ -81,12 +263,14 @@ def detect_frontend_integration(G, frontend_services=None, user='NoUser'):
     Parameters
     __________
     G : networkx.MultiDiGraph,
-        Graph to be studied (converted to simple DiGraph)
+        Graph to be studied (parallel edges are ignored)
     frontend_services : set[str], optional (default None)
         If given, check that services in this set fulfill the property,
         violating services will be returned in frontend_violators
     user : str, optional (default 'NoUser')
         User's name to put in logs
+    verbose : bool, optional (default True)
+        If False, detections are not printed
 
     Returns
     _______
@@ -99,28 +283,35 @@ def detect_frontend_integration(G, frontend_services=None, user='NoUser'):
     if frontend_services is None: frontend_services = set()
     if user is None: user = "NoUser"
 
-    D = nx.DiGraph(G)
+    nodes, in_deg, out_deg, _ = _simple_degrees(G)
+    is_frontend = np.fromiter((node in frontend_services for node in nodes),
+                              dtype=bool, count=len(nodes))
 
     frontend_candidates = set()
     frontend_violators = set()
 
-    for node, in_degree in D.in_degree():
-        if in_degree == 0:
-            if D.out_degree(node) > 0:
-                frontend_candidates.add(node)
+    # Only visit nodes that are candidates or violators
+    called = in_deg > 0
+    reported = ~called & (out_deg > 0) | called & is_frontend
+    for i in np.flatnonzero(reported).tolist():
+        node = nodes[i]
+        if (in_degree := int(in_deg[i])) == 0:
+            frontend_candidates.add(node)
+            if verbose:
                 print(f"{user}: Frontend Integration - potential frontend "
                       f" service '{node}' found.")
-        elif node in frontend_services:
+        else:
             frontend_violators.add(node)
-            print(f"{user}: Frontend Integration Violation - service '{node}' "
-                  f"is designated as frontend service but has incoming calls "
-                  f"({in_degree=})")
+            if verbose:
+                print(f"{user}: Frontend Integration Violation - service "
+                      f"'{node}' is designated as frontend service but has "
+                      f"incoming calls ({in_degree=})")
 
     return frontend_candidates, frontend_violators
 
 
 def detect_information_holder_resource(G, database_services=None,
-                                       user='NoUser'):
+                                       user='NoUser', verbose=True):
     """Detect the Information Holder Resource pattern.
 
     Information Holder Resource (IHR) and Database (DB) service pairs are such
@@ -129,13 +320,15 @@ def detect_information_holder_resource(G, database_services=None,
     Parameters
     __________
     G : networkx.MultiDiGraph,
-        Graph to be studied (converted to simple DiGraph)
+        Graph to be studied (parallel edges are ignored)
     database_services : set[str], optional (default None)
         If given, check that services in this set fulfill the property,
         violating services will be returned in database_call_violators and
         database_no_ihr_violators
     user : str, optional (default 'NoUser')
         User's name to put in logs
+    verbose : bool, optional (default True)
+        If False, detections are not printed
 
     Returns
     _______
@@ -152,37 +345,49 @@ def detect_information_holder_resource(G, database_services=None,
 
     if database_services is None: database_services = set()
 
-    D = nx.DiGraph(G)
+    nodes, in_deg, out_deg, single_pred = _simple_degrees(G)
+    is_database = np.fromiter((node in database_services for node in nodes),
+                              dtype=bool, count=len(nodes))
 
     ihr_candidates = set()
     ihr_violators = set()
     database_call_violators = set()
-    database_no_ihr_violators = database_services.copy()
-
-    for node, out_degree in D.out_degree():
-        zero_degree = out_degree == 0
-        is_database = node in database_services
-        if zero_degree or is_database:
-            if len(preds := D.pred[node]) == 1:
-                pred = [n for n in preds.keys()][0]
-                if len(D.succ[pred]) == 1:
-                    ihr_candidates.add((pred, node))
-                    print(f"{user}: Information Holder Resource - '{pred}' is a"
-                          f" potential IHR for '{node}'")
-                else:
-                    ihr_violators.add((pred, node))
+    databases_with_ihr = set()
+
+    # Only sinks and databases can be accessed through an IHR, visit those
+    # called from a single node and databases that make calls themselves
+    zero_degree = out_deg == 0
+    reported = (zero_degree | is_database) & ((in_deg == 1) | ~zero_degree)
+    for i in np.flatnonzero(reported).tolist():
+        node = nodes[i]
+        if (p := int(single_pred[i])) >= 0:
+            pred = nodes[p]
+            if out_deg[p] == 1:
+                ihr_candidates.add((pred, node))
+                if verbose:
+                    print(f"{user}: Information Holder Resource - '{pred}' "
+                          f"is a potential IHR for '{node}'")
+            else:
+                ihr_violators.add((pred, node))
+                if verbose:
                     print(f"{user}: Information Holder Resouce Violation - "
                           f"'{node}' is only accessed through '{pred}', but "
                           f"'{pred}' calls other services as well.")
-                database_no_ihr_violators.discard(node)
-        if not zero_degree and is_database:
+            if is_database[i]: databases_with_ihr.add(node)
+        # Past the check above, a node with outgoing calls is a database
+        if not zero_degree[i]:
+            out_degree = int(out_deg[i])
             database_call_violators.add(node)
-            print(f"{user}: Information Holder Resource Violation - '{node}'"
-                  f" is designated as database service but has outgoing calls"
-                  f"({out_degree=})")
+            if verbose:
+                print(f"{user}: Information Holder Resource Violation - "
+                      f"'{node}' is designated as database service but has "
+                      f"outgoing calls({out_degree=})")
 
-    for service in database_no_ihr_violators:
-        print(f"{user}: Information Holder Resource Violation - '{service}' "
-              f"is designated as database service but no IHR detected.")
+    database_no_ihr_violators = database_services - databases_with_ihr
+    if verbose:
+        for service in database_no_ihr_violators:
+            print(f"{user}: Information Holder Resource Violation - "
+                  f"'{service}' is designated as database service but no IHR "
+                  f"detected.")
     
     return ihr_candidates, ihr_violators, database_call_violators, database_no_ihr_violators
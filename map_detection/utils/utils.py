@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 from collections import Counter
 from datetime import datetime, timedelta
@@ -97,7 +98,7 @@ def parse_logs(directory, user_boundaries, instance_boundaries):
     for from_service in services:
         # Read log line by line
         f = open(os.path.join(directory, from_service), 'r')
-        from_service = from_service.split('.')[0]
+        from_service = sys.intern(from_service.split('.')[0])
         for line in f:
             # Parse lines containing json bodies
             if line[0] == '{':
@@ -137,6 +138,9 @@ def parse_logs(directory, user_boundaries, instance_boundaries):
                     if endpoint is None: endpoint = '/'
                     endpoint = endpoint.split('/')
                     endpoint = '/'.join(endpoint[0:5])
+                    # Share one object per name, pipelines repeat them a lot
+                    to_service = sys.intern(to_service)
+                    endpoint = sys.intern(endpoint)
 
                     call_counters[user][(from_service, to_service,
                                          endpoint)] += 1
@@ -0,0 +1,123 @@
+"""Compare the detectors with straightforward reference implementations.
+
+The detectors module is loaded from its file, since importing the
+map_detection package also imports modules that are not part of this tree.
+"""
+
+import importlib.util
+import os
+import random
+
+_PATH = os.path.join(os.path.dirname(__file__), os.pardir, 'map_detection',
+                     'detectors', 'detectors.py')
+_spec = importlib.util.spec_from_file_location(
+    'map_detection.detectors.detectors', _PATH)
+detectors = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(detectors)
+
+
+def reference_request_bundle(pipeline, threshold_service, threshold_endpoint):
+    """Plain sequential scan, as detect_request_bundle was first written."""
+
+    bundles_service = []
+    bundles_endpoint = []
+    last_call_service = None
+    last_call_endpoint = None
+    count_service = 1
+    count_endpoint = 1
+    for (time, from_service, to_service, endpoint) in pipeline:
+        current_call_service = from_service, to_service
+        current_call_endpoint = from_service, to_service, endpoint
+        if current_call_service == last_call_service:
+            count_service += 1
+        else:
+            if count_service >= threshold_service:
+                bundles_service.append((*last_call_service, count_service))
+            count_service = 1
+            last_call_service = current_call_service
+        if current_call_endpoint == last_call_endpoint:
+            count_endpoint += 1
+        else:
+            if count_endpoint >= threshold_endpoint:
+                bundles_endpoint.append((*last_call_endpoint, count_endpoint))
+            count_endpoint = 1
+            last_call_endpoint = current_call_endpoint
+
+    return bundles_service, bundles_endpoint
+
+
+def random_pipeline(rng, length):
+    """Pipeline over few services and endpoints, so repeated calls are common."""
+
+    return [(str(i), rng.choice('ab'), rng.choice('cd'), rng.choice(['/x', '/y']))
+            for i in range(length)]
+
+
+def test_request_bundle_matches_reference():
+    rng = random.Random(0)
+    for _ in range(300):
+        pipeline = random_pipeline(rng, rng.randint(0, 40))
+        threshold_service = rng.randint(2, 4)
+        threshold_endpoint = rng.randint(2, 4)
+        expected = reference_request_bundle(pipeline, threshold_service,
+                                            threshold_endpoint)
+        for chunk_size in (1, 2, 3, 7, 65536):
+            result = detectors.detect_request_bundle(
+                iter(pipeline), threshold_service, threshold_endpoint,
+                verbose=False, chunk_size=chunk_size)
+            assert result == expected, (pipeline, chunk_size)
+
+
+def test_graph_detectors_see_graph_changes():
+    import networkx as nx
+
+    G = nx.MultiDiGraph()
+    G.add_edge('ts-ui-dashboard', 'ts-order-service', key='/api/v1/order')
+    G.add_edge('ts-order-service', 'ts-order-mongo', key='/')
+    databases = {'ts-order-mongo'}
+    ihr = detectors.detect_information_holder_resource(G, databases,
+                                                       verbose=False)
+    assert ihr[0] == {('ts-order-service', 'ts-order-mongo')}
+
+    G.add_edge('ts-order-service', 'ts-route-service', key='/api/v1/routes')
+    ihr = detectors.detect_information_holder_resource(G, databases,
+                                                       verbose=False)
+    assert ihr[0] == set()
+    assert ihr[1] == {('ts-order-service', 'ts-order-mongo'),
+                      ('ts-order-service', 'ts-route-service')}
+    frontend = detectors.detect_frontend_integration(G, verbose=False)
+    assert frontend[0] == {'ts-ui-dashboard'}
+
+
+def test_request_bundle_rejects_empty_chunks():
+    pipeline = [('0', 'a', 'c', '/x'), ('1', 'a', 'c', '/x')]
+    for chunk_size in (0, -1):
+        try:
+            detectors.detect_request_bundle(pipeline, verbose=False,
+                                            chunk_size=chunk_size)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"chunk_size={chunk_size} was accepted")
+
+
+def test_graph_detectors_see_rewired_and_relabelled_graphs():
+    import networkx as nx
+
+    G = nx.MultiDiGraph()
+    G.add_edge('ui', 'svc', key='/')
+    G.add_edge('svc', 'mongo', key='/')
+    ihr = detectors.detect_information_holder_resource(G, verbose=False)
+    assert ihr[0] == {('svc', 'mongo')}
+
+    # Same node and edge counts, different graph
+    G.remove_edge('svc', 'mongo')
+    G.add_edge('ui', 'mongo', key='/')
+    ihr = detectors.detect_information_holder_resource(G, verbose=False)
+    assert ihr[0] == set()
+
+    frontend = detectors.detect_frontend_integration(G, verbose=False)
+    assert frontend[0] == {'ui'}
+    nx.relabel_nodes(G, {'ui': 'frontend'}, copy=False)
+    frontend = detectors.detect_frontend_integration(G, verbose=False)
+    assert frontend[0] == {'frontend'}